@@ -9,16 +9,65 @@ $ python parquet_to_csv.py deduplicated_products.parquet [-o output.csv]
 If -o/--out is omitted the script writes a CSV next to the input file with
 “.csv” substituted for the “.parquet” extension.
 
+List and struct columns have no CSV representation and are written as JSON
+strings; binary columns are written as Python bytes reprs (b'...').
+
 Requirements
 ------------
-• pandas ≥ 1.5 (automatically pulls in pyarrow, the default engine)
-  pip install pandas pyarrow
+• pyarrow ≥ 11, orjson
+  pip install pyarrow orjson
 """
 
 import argparse
 import pathlib
 import sys
-import pandas as pd
+from typing import Any, Callable
+
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+DEFAULT_BATCH_SIZE = 1 << 16
+
+
+def _is_binary(t: pa.DataType) -> bool:
+    return pa.types.is_binary(t) or pa.types.is_large_binary(t) or pa.types.is_fixed_size_binary(t)
+
+
+def csv_schema(schema: pa.Schema) -> pa.Schema:
+    """Schema with nested and binary columns replaced by strings."""
+    return pa.schema(
+        pa.field(f.name, pa.string())
+        if pa.types.is_nested(f.type) or _is_binary(f.type)
+        else f
+        for f in schema
+    )
+
+
+def encode_valid(col: pa.Array, encode: Callable[[Any], bytes]) -> pa.Array:
+    """String column of encode(value) for the non-null rows of col."""
+    # only non-null rows are encoded; the UTF-8 bytes are taken as strings
+    # by Arrow without a Python-side decode
+    valid = col.is_valid()
+    encoded = pa.array(
+        [encode(v) for v in col.filter(valid).to_pylist()], type=pa.binary()
+    ).cast(pa.string())
+    return pc.replace_with_mask(pa.nulls(len(col), pa.string()), valid, encoded)
+
+
+def to_csv_batch(batch: pa.RecordBatch, schema: pa.Schema) -> pa.RecordBatch:
+    """Serialize the nested columns of a batch to JSON, binary ones to reprs."""
+    columns = []
+    for col, field in zip(batch.columns, batch.schema):
+        if pa.types.is_nested(field.type):
+            col = encode_valid(col, lambda v: orjson.dumps(v, default=str))
+        elif _is_binary(field.type):
+            # the CSV writer only takes valid UTF-8, so raw bytes are escaped
+            col = encode_valid(col, lambda v: repr(v).encode())
+        columns.append(col)
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
 
 
 def main() -> None:
@@ -37,10 +86,12 @@ def main() -> None:
         "--chunksize",
         type=int,
         default=None,
-        help="Write CSV in chunks of this many rows (reduces peak RAM).",
+        help=f"Stream the file in batches of this many rows (default {DEFAULT_BATCH_SIZE}).",
     )
 
     args = parser.parse_args()
+    if args.chunksize is not None and args.chunksize <= 0:
+        parser.error("--chunksize must be a positive number of rows")
 
     parquet_path = pathlib.Path(args.parquet_path)
     if not parquet_path.exists():
@@ -51,19 +102,23 @@ def main() -> None:
 
     print(f"Loading {parquet_path} …")
     try:
-        df = pd.read_parquet(parquet_path)
+        pf = pq.ParquetFile(parquet_path, pre_buffer=True, memory_map=True)
     except Exception as exc:
         sys.exit(f"Unable to read parquet: {exc}")
 
-    print(f"Writing {csv_path} ({len(df):,} rows) …")
-    # If chunksize was specified, stream to CSV in pieces to lower memory use
-    if args.chunksize:
-        for i in range(0, len(df), args.chunksize):
-            mode = "w" if i == 0 else "a"
-            header = i == 0
-            df.iloc[i : i + args.chunksize].to_csv(csv_path, index=False, mode=mode, header=header)
-    else:
-        df.to_csv(csv_path, index=False)
+    print(f"Writing {csv_path} ({pf.metadata.num_rows:,} rows) …")
+    # Batches go straight from parquet to CSV, so peak RAM is one batch
+    schema = csv_schema(pf.schema_arrow)
+    try:
+        with pv.CSVWriter(csv_path, schema) as writer:
+            for batch in pf.iter_batches(
+                batch_size=args.chunksize or DEFAULT_BATCH_SIZE, use_threads=True
+            ):
+                writer.write_batch(to_csv_batch(batch, schema))
+    except Exception as exc:
+        # don't leave a truncated CSV behind
+        csv_path.unlink(missing_ok=True)
+        sys.exit(f"Unable to write CSV: {exc}")
 
     print("Done.")
 